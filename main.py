@@ -1,97 +1,246 @@
+import numpy as np
 import pandas as pd
 import streamlit as st
 import plotly.express as px
-from streamlit import download_button
-import io
+import os
+import tempfile
+import contextlib
+import json
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
 import plotly.graph_objects as go
 
-# Función básica para calcular ROA
-def calcularROAunMES(df):
-    # Calcular los Ingresos Totales
-    ingresos_totales = df[df["TIPO"] == 5]["PADRE JULIAN LORENTE LTDA"].sum()
-    # Calcular los Gastos Totales
-    gastos_totales = df[df["TIPO"] == 4]["PADRE JULIAN LORENTE LTDA"].sum()
-    # Calcular los Activos
-    activos = df[df["CODIGO_CONTABLE"] == 1]["PADRE JULIAN LORENTE LTDA"].sum()
-    # Calcular la Utilidad neta
-    utilidad_neta = ingresos_totales - gastos_totales
-    return ingresos_totales, gastos_totales, utilidad_neta
-
-# Función básica para calcular ROA de dos meses
-def calcularROAMESES(mes, df, mes1, df1):
-    resultados = {
-        'Mes': [],
-        'Ingresos Totales': [],
-        'Gastos Totales': [],
-        'Utilidad Neta': [],
-        'Activo Promedio': [],
-    }
-    ingresos_totales = df[df["TIPO"] == 5]["PADRE JULIAN LORENTE LTDA"].sum()
-    gastos_totales = df[df["TIPO"] == 4]["PADRE JULIAN LORENTE LTDA"].sum()
-    activos = df[df["CODIGO_CONTABLE"] == 1]["PADRE JULIAN LORENTE LTDA"].sum()
-    utilidad_neta1 = ingresos_totales - gastos_totales
-
-    resultados['Mes'].append(mes)
-    resultados['Ingresos Totales'].append(ingresos_totales)
-    resultados['Gastos Totales'].append(gastos_totales)
-    resultados['Activo Promedio'].append(activos)
-    resultados['Utilidad Neta'].append(utilidad_neta1)
-
-    ingresos_totales1 = df1[df1["TIPO"] == 5]["PADRE JULIAN LORENTE LTDA"].sum()
-    gastos_totales1 = df1[df1["TIPO"] == 4]["PADRE JULIAN LORENTE LTDA"].sum()
-    activos1 = df1[df1["CODIGO_CONTABLE"] == 1]["PADRE JULIAN LORENTE LTDA"].sum()
-    utilidad_neta2 = ingresos_totales1 - gastos_totales1
-    resultados['Mes'].append(mes1)
-    resultados['Ingresos Totales'].append(ingresos_totales1)
-    resultados['Gastos Totales'].append(gastos_totales1)
-    resultados['Activo Promedio'].append(activos1)
-    resultados['Utilidad Neta'].append(utilidad_neta2)
-
-    utilidad_neta = utilidad_neta1 + utilidad_neta2
-    activo_promedio = (activos + activos1) / 2
-    ROA = (utilidad_neta / activo_promedio) * 100
-
-    return pd.DataFrame(resultados), ingresos_totales1, gastos_totales1, utilidad_neta, ROA
+# División que devuelve 0 cuando el denominador es 0, para todos los indicadores
+def dividir_seguro(numerador, denominador):
+    return numerador / denominador if denominador else 0.0
+
+# Función básica para calcular ROA de dos meses de un año
+def calcularROAMESES(mes, mes1, año):
+    agregados = AGG_POR_AÑO[año]
+    inicio, final = agregados[mes], agregados[mes1]
+
+    # Tabla de dos filas construida de una vez, con los tipos ya definidos
+    resultados = pd.DataFrame({
+        'Mes': np.array([mes, mes1], dtype=object),
+        'Ingresos Totales': np.array([inicio['ingresos'], final['ingresos']], dtype=np.float64),
+        'Gastos Totales': np.array([inicio['gastos'], final['gastos']], dtype=np.float64),
+        'Utilidad Neta': np.array([inicio['utilidad'], final['utilidad']], dtype=np.float64),
+        'Activo Promedio': np.array([inicio['activo'], final['activo']], dtype=np.float64),
+    }, copy=False)
+
+    utilidad_neta = inicio['utilidad'] + final['utilidad']
+    activo_promedio = (inicio['activo'] + final['activo']) / 2
+    ROA = dividir_seguro(utilidad_neta, activo_promedio) * 100
+
+    return resultados, final['ingresos'], final['gastos'], utilidad_neta, ROA
 
 # Función básica para calcular Eficiencia en Gasto Operativo
-def calcularEficienciaGastoOperativo(df):
-    ingresos_totales = df[df["TIPO"] == 5]["PADRE JULIAN LORENTE LTDA"].sum()
-    gastos_operativos = df[df["CODIGO_CONTABLE"] == 45]["PADRE JULIAN LORENTE LTDA"].sum()
-    eficiencia = ((ingresos_totales - gastos_operativos) / ingresos_totales) * 100
+def calcularEficienciaGastoOperativo(mes):
+    ingresos_totales = AGG[mes]['ingresos']
+    gastos_operativos = AGG[mes]['gastos_op']
+    eficiencia = AGG[mes]['eficiencia']
     return eficiencia, ingresos_totales, gastos_operativos
 
 # Función básica para calcular Solvencia Patrimonial
-def calcularSolvenciaPatrimonial(df):
-    patrimonio = df[df["TIPO"] == 3]["PADRE JULIAN LORENTE LTDA"].sum()
-    activo_total = df[df["CODIGO_CONTABLE"] == 1]["PADRE JULIAN LORENTE LTDA"].sum()
-    solvencia = (patrimonio / activo_total) * 100
+def calcularSolvenciaPatrimonial(mes):
+    patrimonio = AGG[mes]['patrimonio']
+    activo_total = AGG[mes]['activo']
+    solvencia = AGG[mes]['solvencia']
     return solvencia, patrimonio, activo_total
 
+# Unir todos los meses en un solo DataFrame con la columna 'Mes'
+def unir_meses(dfs):
+    return pd.concat(dfs, names=['Mes', 'fila']).reset_index(level='Mes').reset_index(drop=True)
+
+# Sumas de cada mes por TIPO y por CODIGO_CONTABLE: un solo groupby sobre
+# todos los meses en lugar de volver a filtrar cada DataFrame
+def calcular_sumas_por_mes(ALL, meses):
+    TIPO_SUM = ALL.groupby(['Mes', 'TIPO'], sort=False, observed=True)["PADRE JULIAN LORENTE LTDA"].sum().unstack(fill_value=0).reindex(meses)
+    COD_SUM = ALL.groupby(['Mes', 'CODIGO_CONTABLE'], sort=False)["PADRE JULIAN LORENTE LTDA"].sum().unstack(fill_value=0).reindex(meses)
+    return TIPO_SUM, COD_SUM
+
+# Agregados de cada mes a partir de las sumas precalculadas
+def calcular_agregados_mensuales(TIPO_SUM, COD_SUM):
+    agregados = pd.DataFrame({
+        'ingresos': TIPO_SUM.get(5, 0.0),
+        'gastos': TIPO_SUM.get(4, 0.0),
+        'patrimonio': TIPO_SUM.get(3, 0.0),
+        'activo': COD_SUM.get(1, 0.0),
+        'gastos_op': COD_SUM.get(45, 0.0),
+    })
+    # Indicadores de todos los meses a la vez, una expresión por indicador; como
+    # en dividir_seguro, un denominador 0 da 0
+    agregados['utilidad'] = agregados.eval("ingresos - gastos")
+    agregados['eficiencia'] = agregados.eval("(ingresos - gastos_op) / ingresos * 100").where(agregados['ingresos'] != 0, 0.0)
+    agregados['solvencia'] = agregados.eval("patrimonio / activo * 100").where(agregados['activo'] != 0, 0.0)
+    return agregados.to_dict('index')
+
 # Función básica para graficar
 def crearGraficoBasico(datos, titulo):
     fig = px.bar(datos, x='Categoria', y='Valor', title=titulo)
     return fig
 
-# Cargar datos básicos
-dfs = {
-'Enero' : pd.read_csv('CSV/ENERO.csv'),
-'Febrero' : pd.read_csv('CSV/FEBRERO.csv'),
-'Marzo' : pd.read_csv('CSV/MARZO.csv'),
-'Abril' : pd.read_csv('CSV/ABRIL.csv'),
-'Mayo' : pd.read_csv('CSV/MAYO.csv'),
-'Junio' : pd.read_csv('CSV/JUNIO.csv'),
-'Julio' : pd.read_csv('CSV/JULIO.csv'),
-'Agosto' : pd.read_csv('CSV/AGOSTO.csv'),
-'Septiembre' : pd.read_csv('CSV/SEPTIEMBRE.csv'),
-'Octubre' : pd.read_csv('CSV/OCTUBRE.csv'),
-'Noviembre' : pd.read_csv('CSV/NOVIEMBRE.csv'),
+# Gráfico de resumen del último mes; no cambia entre reruns, se construye una vez
+@st.cache_resource
+def crear_grafico_resumen(mes, ingresos_millions, gastos_millions, utilidad_millions):
+    fig = go.Figure([go.Bar(x=['Ingresos', 'Gastos', 'Utilidad'],
+                            y=[ingresos_millions, gastos_millions, utilidad_millions],
+                            marker_color=['#4CAF50', '#F44336', '#2196F3'],
+                            texttemplate='%{y:.1f}M', textposition='outside')])
+    fig.update_layout(title=f'Resumen Financiero - {mes} (en Millones)',
+                      showlegend=False, xaxis_title='Categoría', yaxis_title='Millones de $')
+    return fig
+
+# Gráfico de evolución de dos meses, cacheado por meses y valores
+@st.cache_resource
+def crear_grafico_evolucion(mes_inicio, mes_final, ingresos, gastos, utilidad):
+    meses = [mes_inicio, mes_final]
+    series = {
+        'Ingresos Totales': ingresos,
+        'Gastos Totales': gastos,
+        'Utilidad Neta': utilidad,
+    }
+    colores = ['#4CAF50', '#F44336', '#2196F3']
+    fig = go.Figure([go.Scatter(x=meses, y=list(valores), name=nombre, mode='lines+markers',
+                                line=dict(color=color))
+                     for (nombre, valores), color in zip(series.items(), colores)])
+    fig.update_layout(title=f'Evolución Financiera: {mes_inicio} vs {mes_final}',
+                      yaxis_title='Monto ($)', xaxis_title='Mes')
+    return fig
+
+# Gráfico de composición de ingresos de un mes, cacheado por mes y valores
+@st.cache_resource
+def crear_grafico_composicion(mes, gastos, ahorro):
+    fig = px.pie(values=[gastos, ahorro], names=['Gastos Operativos', 'Ingresos Restantes'],
+                 title=f'Composición de Ingresos - {mes}',
+                 color_discrete_sequence=['#F44336', '#4CAF50'])
+    return fig
+
+# Archivos CSV de cada mes por año: 2023 en CSV/ y 2022 en CSV/2022/
+MESES_ARCHIVO = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio', 'Julio',
+                 'Agosto', 'Septiembre', 'Octubre', 'Noviembre']
+ARCHIVOS_MESES = {
+'2022' : {mes: f'CSV/2022/{mes}.csv' for mes in MESES_ARCHIVO},
+'2023' : {mes: f'CSV/{mes.upper()}.csv' for mes in MESES_ARCHIVO},
 }
 
-# Limpiar datos básicos
-for df in dfs.values():
-    if 'Unnamed: 5' in df.columns:
-        df.drop('Unnamed: 5', axis=1, inplace=True)
-    df["PADRE JULIAN LORENTE LTDA"] = df["PADRE JULIAN LORENTE LTDA"].astype(str).str.replace(',', '').astype(float)
+# Tipos de cuenta del catálogo (1 Activo ... 7 Cuentas de orden); como
+# categoría fija se guardan en un byte y se conservan al unir los meses
+TIPOS_CUENTA = pd.CategoricalDtype([1, 2, 3, 4, 5, 6, 7])
+
+# Configuración de los gráficos de resumen: se dibujan estáticos, sin barra de
+# herramientas ni eventos de zoom/hover en el navegador
+CONFIG_GRAFICO_ESTATICO = {'staticPlot': True, 'displayModeBar': False}
+
+# Versión del formato del cache: subirla cada vez que cambien las columnas o
+# los tipos que devuelven leer_csv_mes o unir_meses, para que los Parquet
+# escritos por el lector anterior dejen de usarse
+VERSION_CACHE = 2
+
+# Firma de los CSV de un año: tamaño y fecha de modificación de cada archivo,
+# con un stat por CSV y sin tocar el resto de la carpeta; un CSV que falta
+# queda en None
+def firma_csv(año):
+    firma = []
+    for ruta in ARCHIVOS_MESES[año].values():
+        try:
+            datos = os.stat(ruta)
+        except FileNotFoundError:
+            firma.append(None)
+        else:
+            firma.append((datos.st_size, datos.st_mtime_ns))
+    return tuple(firma)
+
+# El Parquet de un año sirve solo si se escribió a partir de estos mismos CSV:
+# la firma guardada en sus metadatos debe ser igual, no solo más antigua, así
+# que un CSV copiado conservando su fecha también invalida el cache. Solo se
+# lee el pie del archivo
+def cache_vigente(ruta_cache, firma):
+    if None in firma:
+        return False
+    try:
+        metadatos = pq.read_schema(ruta_cache).metadata or {}
+    except (OSError, pa.ArrowException):
+        return False
+    return metadatos.get(b'firma_csv') == json.dumps(firma).encode()
+
+# Leer el CSV de un mes: el parser de pandas quita las comas de miles y solo
+# lee las columnas que usa el dashboard
+def leer_csv_mes(ruta):
+    return pd.read_csv(ruta, thousands=',',
+                       dtype={'PADRE JULIAN LORENTE LTDA': 'float64',
+                              'TIPO': TIPOS_CUENTA,
+                              'CODIGO_CONTABLE': 'int32'},
+                       usecols=['CODIGO_CONTABLE', 'TIPO', 'PADRE JULIAN LORENTE LTDA'],
+                       engine='c')
+
+# Leer el Parquet de un año; si está truncado o no se puede abrir se devuelve
+# None y los meses se vuelven a leer de los CSV
+def leer_cache(ruta_cache):
+    try:
+        return pd.read_parquet(ruta_cache, engine='pyarrow').astype({'TIPO': TIPOS_CUENTA})
+    except (OSError, pa.ArrowException):
+        return None
+
+# Guardar el Parquet en un temporal de la misma carpeta y moverlo a su lugar
+# con os.replace, para que nadie lea nunca un archivo a medio escribir. El
+# cache es opcional: si la carpeta no admite escritura no se guarda
+def guardar_cache(df, ruta_cache, firma):
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    tabla = tabla.replace_schema_metadata({**(tabla.schema.metadata or {}),
+                                           b'firma_csv': json.dumps(firma).encode()})
+    carpeta, nombre = os.path.split(ruta_cache)
+    try:
+        fd, ruta_tmp = tempfile.mkstemp(prefix=f'{nombre}.', suffix='.tmp', dir=carpeta)
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, 'wb') as salida:
+            pq.write_table(tabla, salida, compression='zstd')
+        os.replace(ruta_tmp, ruta_cache)
+    except (OSError, pa.ArrowException):
+        with contextlib.suppress(OSError):
+            os.remove(ruta_tmp)
+
+# Cargar los meses de un año ya unidos en un solo DataFrame con la columna
+# 'Mes'. Tras la primera lectura se guardan en un Parquet, que se lee en lugar
+# de los CSV en los siguientes arranques mientras la firma coincida
+def load_all_months(año, firma):
+    ruta_cache = f'CSV/cache_{año}_v{VERSION_CACHE}.parquet'
+    todos = leer_cache(ruta_cache) if cache_vigente(ruta_cache, firma) else None
+    if todos is not None:
+        return todos
+
+    # El parser C de pandas libera el GIL, así que los meses se leen en paralelo
+    archivos = ARCHIVOS_MESES[año]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        dfs = dict(zip(archivos, executor.map(leer_csv_mes, archivos.values())))
+    todos = unir_meses(dfs)
+    guardar_cache(todos, ruta_cache, firma)
+    return todos
+
+# Agregados precalculados por mes de un año, una sola vez por versión de los
+# archivos. La clave del caché es el año y la firma de sus CSV, así que un
+# archivo reemplazado se vuelve a leer sin reiniciar la app y en cada rerun no
+# se hashean los DataFrame de los meses. Con una entrada por año, la versión
+# anterior de un año se descarta al cambiar sus CSV
+@st.cache_data(show_spinner=False, max_entries=len(ARCHIVOS_MESES))
+def agregar_año(año, firma):
+    ALL = load_all_months(año, firma)
+    TIPO_SUM, COD_SUM = calcular_sumas_por_mes(ALL, list(ARCHIVOS_MESES[año]))
+    return TIPO_SUM, calcular_agregados_mensuales(TIPO_SUM, COD_SUM)
+
+TIPO_SUM_POR_AÑO, AGG_POR_AÑO = {}, {}
+for año_datos in ARCHIVOS_MESES:
+    TIPO_SUM_POR_AÑO[año_datos], AGG_POR_AÑO[año_datos] = agregar_año(año_datos, firma_csv(año_datos))
+
+# El resumen y las pestañas de eficiencia y solvencia usan 2023
+TIPO_SUM, AGG = TIPO_SUM_POR_AÑO['2023'], AGG_POR_AÑO['2023']
+
+# Meses y años disponibles, fijos durante la sesión
+MESES = tuple(TIPO_SUM.index)
+AÑOS = tuple(ARCHIVOS_MESES)
 
 # Valores fijos originales
 roa = 3.73
@@ -99,14 +248,18 @@ eficiencia_gasto_operativo = 8.75
 solvencia_patrimonial = 40.56
 
 st.header("DASHBOARD")
-# Crear la "tarjeta" de indicador básica
-def mostrar_indicador(titulo, valor, unidad='%'):
-    st.markdown(f"""
+# Plantilla HTML de la "tarjeta" de indicador, definida una sola vez
+_TEMPLATE_INDICADOR = """
     <div style='padding: 20px; border-radius: 10px; background-color: #ffcc00; margin: 10px 0; text-align: center;'>
         <h4>{titulo}</h4>
         <h2>{valor}{unidad}</h2>
     </div>
-    """, unsafe_allow_html=True)
+    """
+
+# Crear la "tarjeta" de indicador básica
+def mostrar_indicador(titulo, valor, unidad='%'):
+    st.markdown(_TEMPLATE_INDICADOR.format(titulo=titulo, valor=valor, unidad=unidad),
+                unsafe_allow_html=True)
 
 col1, col2, col3 = st.columns(3)
 with col1:
@@ -119,12 +272,11 @@ with col3:
 # Gráfico principal de resumen - usando datos reales del último mes disponible
 st.subheader("📊 Resumen Financiero - Último Mes")
 ultimo_mes = 'Noviembre'  # Último mes disponible
-df_resumen = dfs[ultimo_mes]
 
-# Calcular valores reales para el resumen
-ingresos_resumen = df_resumen[df_resumen["TIPO"] == 5]["PADRE JULIAN LORENTE LTDA"].sum()
-gastos_resumen = df_resumen[df_resumen["TIPO"] == 4]["PADRE JULIAN LORENTE LTDA"].sum()
-utilidad_resumen = ingresos_resumen - gastos_resumen
+# Valores reales para el resumen, tomados de los agregados precalculados
+agg = AGG[ultimo_mes]
+ingresos_resumen, gastos_resumen = agg['ingresos'], agg['gastos']
+utilidad_resumen = agg['utilidad']
 
 # Mostrar métricas principales
 col_metricas, col_grafico = st.columns([1, 2])
@@ -134,7 +286,7 @@ with col_metricas:
     st.metric("**Gastos Totales**", f"${gastos_resumen:,.2f}")
     st.metric("**Utilidad Neta**", f"${utilidad_resumen:,.2f}")
     # Calcular margen de utilidad
-    margen = (utilidad_resumen / ingresos_resumen * 100) if ingresos_resumen > 0 else 0
+    margen = dividir_seguro(utilidad_resumen, ingresos_resumen) * 100
     st.metric("**Margen de Utilidad**", f"{margen:.2f}%")
 
 with col_grafico:
@@ -143,18 +295,8 @@ with col_grafico:
     gastos_millions = gastos_resumen / 1_000_000
     utilidad_millions = utilidad_resumen / 1_000_000
     
-    datos_resumen = {
-        'Categoría': ['Ingresos', 'Gastos', 'Utilidad'],
-        'Valor (Millones)': [ingresos_millions, gastos_millions, utilidad_millions]
-    }
-    df_grafico_resumen = pd.DataFrame(datos_resumen)
-    fig_resumen = px.bar(df_grafico_resumen, x='Categoría', y='Valor (Millones)',
-                         title=f'Resumen Financiero - {ultimo_mes} (en Millones)',
-                         color='Categoría',
-                         color_discrete_sequence=['#4CAF50', '#F44336', '#2196F3'])
-    fig_resumen.update_layout(showlegend=False, yaxis_title='Millones de $')
-    fig_resumen.update_traces(texttemplate='%{y:.1f}M', textposition='outside')
-    st.plotly_chart(fig_resumen)
+    fig_resumen = crear_grafico_resumen(ultimo_mes, ingresos_millions, gastos_millions, utilidad_millions)
+    st.plotly_chart(fig_resumen, use_container_width=True, config=CONFIG_GRAFICO_ESTATICO)
 
 # Sidebar básico
 with st.sidebar:
@@ -173,90 +315,77 @@ with tab1:
     # Mantener los selectores de mes como estaban
     col1, col2, col3 = st.columns([2,2,1])
     with col1:
-        mes_inicio = st.selectbox("Seleccione el mes inicial:", list(dfs.keys()))
+        mes_inicio = st.selectbox("Seleccione el mes inicial:", MESES)
     with col2:
-        mes_final = st.selectbox("Seleccione el mes final:", list(dfs.keys()))
+        mes_final = st.selectbox("Seleccione el mes final:", MESES)
     with col3:
-        año = st.selectbox("Seleccione el año:", ['2022','2023'])
-
-    if True:  # Siempre mostrar la comparación de dos meses
-
-        if año == '2022':
-            df_inicio = dfs[mes_inicio]
-            df_final = dfs[mes_final]
-        else:
-            df_inicio = dfs[mes_inicio]
-            df_final = dfs[mes_final]
+        año = st.selectbox("Seleccione el año:", AÑOS)
 
-        df_meses, ingresos, gastos, utilidad, roa_calc = calcularROAMESES(mes_inicio,df_inicio,mes_final, df_final)
+    df_meses, ingresos, gastos, utilidad, roa_calc = calcularROAMESES(mes_inicio, mes_final, año)
 
-        # Mostrar resultados principales
-        col_resultados, col_grafico = st.columns([1, 2])
+    # Mostrar resultados principales
+    col_resultados, col_grafico = st.columns([1, 2])
 
-        with col_resultados:
-            st.metric("**ROA Calculado**", f"{roa_calc:.2f}%")
-            st.metric("**Utilidad Total**", f"${utilidad:,.2f}")
-            st.metric("**Activo Promedio**", f"${(df_meses['Activo Promedio'].mean()):,.2f}")
+    with col_resultados:
+        st.metric("**ROA Calculado**", f"{roa_calc:.2f}%")
+        st.metric("**Utilidad Total**", f"${utilidad:,.2f}")
+        st.metric("**Activo Promedio**", f"${(df_meses['Activo Promedio'].mean()):,.2f}")
 
-        with col_grafico:
-            # Gráfico de líneas para mostrar la evolución
-            fig = px.line(df_meses, x='Mes', y=['Ingresos Totales', 'Gastos Totales', 'Utilidad Neta'],
-                         title=f'Evolución Financiera: {mes_inicio} vs {mes_final}',
-                         markers=True,
-                         color_discrete_sequence=['#4CAF50', '#F44336', '#2196F3'])
-            fig.update_layout(yaxis_title='Monto ($)', xaxis_title='Mes')
-            st.plotly_chart(fig)
+    with col_grafico:
+        # Gráfico de líneas para mostrar la evolución
+        fig = crear_grafico_evolucion(mes_inicio, mes_final,
+                                      tuple(df_meses['Ingresos Totales']),
+                                      tuple(df_meses['Gastos Totales']),
+                                      tuple(df_meses['Utilidad Neta']))
+        st.plotly_chart(fig, use_container_width=True, config=CONFIG_GRAFICO_ESTATICO)
 
-        # Tabla de detalles (colapsable para no ocupar espacio)
-        with st.expander("Ver detalles completos"):
-            st.dataframe(df_meses)
+    # Tabla de detalles (colapsable para no ocupar espacio)
+    with st.expander("Ver detalles completos"):
+        st.dataframe(df_meses)
 
 # Gráfico de Evolución Financiera Anual (fuera de las pestañas)
 st.markdown("---")
 st.subheader("📈 Evolución Financiera Anual")
 
 # Función para crear datos anuales
-def crear_datos_evolucion_anual(dfs):
-    meses = []
-    ingresos_anuales = []
-    gastos_anuales = []
-    utilidad_anuales = []
-    
-    for mes, df in dfs.items():
-        ingresos = df[df["TIPO"] == 5]["PADRE JULIAN LORENTE LTDA"].sum()
-        gastos = df[df["TIPO"] == 4]["PADRE JULIAN LORENTE LTDA"].sum()
-        utilidad = ingresos - gastos
-        
-        meses.append(mes)
-        ingresos_anuales.append(ingresos / 1_000_000)  # Convertir a millones
-        gastos_anuales.append(gastos / 1_000_000)
-        utilidad_anuales.append(utilidad / 1_000_000)
-    
+@st.cache_data
+def crear_datos_evolucion_anual(TIPO_SUM):
+    ingresos = TIPO_SUM[5] / 1_000_000  # Convertir a millones
+    gastos = TIPO_SUM[4] / 1_000_000
+    utilidad = (TIPO_SUM[5] - TIPO_SUM[4]) / 1_000_000
+
     return {
-        'Mes': meses,
-        'Ingresos (Millones)': ingresos_anuales,
-        'Gastos (Millones)': gastos_anuales,
-        'Utilidad (Millones)': utilidad_anuales
+        'Mes': list(TIPO_SUM.index),
+        'Ingresos (Millones)': ingresos.tolist(),
+        'Gastos (Millones)': gastos.tolist(),
+        'Utilidad (Millones)': utilidad.tolist()
     }
 
+# Gráfico anual: se construye una sola vez por versión de los datos; los
+# meses y los valores forman la clave del caché
+@st.cache_resource
+def crear_grafico_evolucion_anual(meses, datos_anuales):
+    colores = ['#4CAF50', '#F44336', '#2196F3']
+    fig = go.Figure([go.Scatter(x=datos_anuales['Mes'], y=datos_anuales[serie], name=serie,
+                                mode='lines+markers', line=dict(color=color))
+                     for serie, color in zip(['Ingresos (Millones)', 'Gastos (Millones)', 'Utilidad (Millones)'],
+                                             colores)])
+    fig.update_layout(
+        title='Evolución Financiera - Todo el Año (en Millones)',
+        yaxis_title='Millones de $',
+        xaxis_title='Mes',
+        xaxis={'categoryorder': 'array', 'categoryarray': list(meses)},
+        height=500
+    )
+    fig.update_traces(line=dict(width=3), marker=dict(size=8))
+    return fig
+
 # Crear datos para el gráfico anual
-datos_anuales = crear_datos_evolucion_anual(dfs)
-df_evolucion = pd.DataFrame(datos_anuales)
+datos_anuales = crear_datos_evolucion_anual(TIPO_SUM)
 
 # Gráfico de líneas de evolución a
 # nual
-fig_evolucion = px.line(df_evolucion, x='Mes', 
-                       y=['Ingresos (Millones)', 'Gastos (Millones)', 'Utilidad (Millones)'],
-                       title='Evolución Financiera - Todo el Año (en Millones)',
-                       markers=True,
-                       color_discrete_sequence=['#4CAF50', '#F44336', '#2196F3'])
-fig_evolucion.update_layout(
-    yaxis_title='Millones de $',
-    xaxis_title='Mes',
-    xaxis={'categoryorder': 'array', 'categoryarray': list(dfs.keys())},
-    height=500
-)
-fig_evolucion.update_traces(line=dict(width=3), marker=dict(size=8))
+fig_evolucion = crear_grafico_evolucion_anual(MESES, datos_anuales)
 st.plotly_chart(fig_evolucion, use_container_width=True)
 
 # Métricas resumen del año
@@ -265,7 +394,7 @@ col_resumen1, col_resumen2, col_resumen3, col_resumen4 = st.columns(4)
 ingresos_total_año = sum(datos_anuales['Ingresos (Millones)'])
 gastos_total_año = sum(datos_anuales['Gastos (Millones)'])
 utilidad_total_año = sum(datos_anuales['Utilidad (Millones)'])
-margen_promedio_año = (utilidad_total_año / ingresos_total_año * 100) if ingresos_total_año > 0 else 0
+margen_promedio_año = dividir_seguro(utilidad_total_año, ingresos_total_año) * 100
 
 with col_resumen1:
     st.metric("**Ingresos Totales Año**", f"${ingresos_total_año:.1f}M")
@@ -281,11 +410,10 @@ with tab2:
     st.header("Eficiencia en gasto operativo")
 
     # Selector de mes básico
-    mes_seleccionado = st.selectbox("Selecciona un mes para calcular la eficiencia:", list(dfs.keys()))
-    df_seleccionado = dfs[mes_seleccionado]
+    mes_seleccionado = st.selectbox("Selecciona un mes para calcular la eficiencia:", MESES)
 
     # Calcular eficiencia
-    eficiencia, ingresos, gastos = calcularEficienciaGastoOperativo(df_seleccionado)
+    eficiencia, ingresos, gastos = calcularEficienciaGastoOperativo(mes_seleccionado)
 
     # Mostrar resultados principales
     col_metricas, col_grafico = st.columns([1, 2])
@@ -299,26 +427,17 @@ with tab2:
 
     with col_grafico:
         # Gráfico de composición: qué porcentaje representan los gastos operativos
-        datos_composicion = {
-            'Categoría': ['Gastos Operativos', 'Ingresos Restantes'],
-            'Valor': [gastos, ahorro],
-            'Tipo': ['Gasto', 'Beneficio']
-        }
-        df_composicion = pd.DataFrame(datos_composicion)
-        fig_composicion = px.pie(df_composicion, values='Valor', names='Categoría',
-                                title=f'Composición de Ingresos - {mes_seleccionado}',
-                                color_discrete_sequence=['#F44336', '#4CAF50'])
-        st.plotly_chart(fig_composicion)
+        fig_composicion = crear_grafico_composicion(mes_seleccionado, gastos, ahorro)
+        st.plotly_chart(fig_composicion, use_container_width=True, config=CONFIG_GRAFICO_ESTATICO)
 
 with tab3:
     st.header("Solvencia Patrimonial")
 
     # Selector de mes básico
-    mes_seleccionado_sol = st.selectbox("Selecciona un mes para calcular la solvencia:", list(dfs.keys()))
-    df_seleccionado_sol = dfs[mes_seleccionado_sol]
+    mes_seleccionado_sol = st.selectbox("Selecciona un mes para calcular la solvencia:", MESES)
 
     # Calcular solvencia
-    solvencia, patrimonio, activo = calcularSolvenciaPatrimonial(df_seleccionado_sol)
+    solvencia, patrimonio, activo = calcularSolvenciaPatrimonial(mes_seleccionado_sol)
 
     # Mostrar resultados principales
     col_metricas, col_grafico = st.columns([1, 2])